@@ -11,16 +11,18 @@
 #
 import sys
 import os
-import re
 import csv
-import glob
 import time
+import operator
+import mmap
+import math
 
 #
 # You can choose to import only certain parts of a library as well
 #
 from datetime import datetime
-from collections import OrderedDict,defaultdict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
 #
 # Hey! Our first bit of actual code.  This is just a variable storing how many hours the times need
@@ -28,14 +30,52 @@ from collections import OrderedDict,defaultdict
 #
 timezone_offset = 4
 
+#
+# The same offset in seconds.  It never changes, so we work it out once here instead of for every row.
+#
+timezone_seconds = 3600 * timezone_offset
+
+#
+# These are the beginnings of the header lines we are looking for in the log files.  Each one always starts
+# with the same text, so we can just check the start of the line instead of using a regular expression.
+# The b in front of the quotes makes them "bytes" instead of strings, so we can check the lines from the
+# file before decoding them.
+#
+_HEADER_PREFIX     = b'DD/MM/YYYY HH:MM:SS\t'
+_PROGRAMMED_PREFIX = b'Programmed: '
+_END_PREFIX        = b'End of logging (DD/MM/YYYY HH:MM:SS): '
+_DRIFT_PREFIX      = b'Drift (secs): '
+
 #
 # def defines a function.  Here we are making a parse_time function that takes a date in the string
 # format of "06/10/2022 13:35:33", and turns it into a unix timestamp, which is the number of seconds
 # that have passed since Midnight on Jan 1 1970.  This time is known as the Unix Epoch.
 #
+# The line starting with @ is a "decorator".  lru_cache remembers the results of the function, so if it is
+# called again with the same string it returns the saved answer instead of parsing the time again.  The
+# loggers record at fixed intervals, so the same times show up over and over across files.
+#
+# The time is always in the same place in the string, so we cut out each part by its position and turn it
+# into a number with int().  That is much faster than asking strptime() to figure out the format.  Creating
+# the datetime() still checks that the day, month, etc. make sense.  Any bad time ends up in the "except".
+#
+@lru_cache(maxsize=200_000)
 def parse_time(timestring):
     try:
-        return int(time.mktime(datetime.strptime(timestring, '%d/%m/%Y %H:%M:%S').timetuple()))
+        if len(timestring) != 19 or timestring[2] != '/' or timestring[5] != '/' or timestring[10] != ' ':
+            return 0
+        if timestring[13] != ':' or timestring[16] != ':':
+            return 0
+
+        parsed = datetime(
+            int(timestring[6:10]),  # year
+            int(timestring[3:5]),   # month
+            int(timestring[0:2]),   # day
+            int(timestring[11:13]), # hour
+            int(timestring[14:16]), # minute
+            int(timestring[17:19])  # second
+        )
+        return int(time.mktime(parsed.timetuple()))
     except:
         return 0
 
@@ -49,44 +89,229 @@ def parse_time(timestring):
 #
 
 #
-# This function converts the unix timestamp back to a string with the format of "2022-10-06 13:35:33"
+# This function converts the unix timestamp back to a string with the format of "2022-10-06 13:35:33".
+#
+# When a file has drift, the adjusted timestamps have fractions of a second, so almost every one is different
+# and caching them would never help.  The string only shows whole seconds, so we work out which second it
+# would show and cache on that instead.  fromtimestamp() rounds to the nearest microsecond first, so a time a
+# tiny bit under the next second shows as that next second.  modf() splits the timestamp into the fraction
+# and the whole seconds, and we round the fraction the same way to match.
 #
 def time_to_string(timestamp):
-    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    fraction, seconds = math.modf(timestamp)
+    if round(fraction * 1e6) >= 1_000_000:
+        seconds += 1
+
+    return second_to_string(int(seconds))
 
 #
-# This is the meat of the script.  It parses individual log files.
+# This does the actual conversion for a whole second.  It's cached the same way as parse_time() above.
 #
-def read_data_file(path):
-    #
-    # Create an ordered dictionary to store the data from the file.  Dictionaries will be talked about
-    # further down.
-    #
-    data = OrderedDict([])
+@lru_cache(maxsize=200_000)
+def second_to_string(seconds):
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
 
+#
+# The log files are read in two parts.  First there are some header lines that describe the file, and then
+# the data rows.  This function reads the header lines from "buffer", until it finds the line that names the
+# columns of the data rows.  It returns the field the file has data for, along with "start" and "dps" which
+# are needed to adjust the times in the data rows.  "buffer" is left at the first data row, so the next
+# readline() after this gives us the data.
+#
+def _parse_header(buffer):
     #
     # This is a mapping of the header values used in the different logger files, to how they are stored
-    # in our data dictionaries for processing
+    # in our output for processing
     #
-    fields = OrderedDict([
-        ("T('C)",       "temp"),
-        ("light(lux)",  "light"),
-        ("wets0-50",    "wets"),
-        ("wet min('C)", "wet_temp_min"),
-        ("wet/dry",     "wetdry"),
-        ("duration",    "duration")
-    ])
+    fields = {
+        "T('C)":       "temp",
+        "light(lux)":  "light",
+        "wets0-50":    "wets",
+        "wet min('C)": "wet_temp_min",
+        "wet/dry":     "wetdry",
+        "duration":    "duration"
+    }
 
     #
     # These are variables used for processing.  They will be explained as we go.
     #
-    start   = 0
-    end     = 0
-    drift   = 0
-    dps     = 0
-    field   = None
-    in_data = False
-    match   = None
+    start = 0
+    end   = 0
+    drift = 0
+    dps   = 0
+
+    #
+    # iter() calls buffer.readline over and over, giving us one line at a time, until it returns an empty
+    # value at the end of the file
+    #
+    for raw in iter(buffer.readline, b''):
+        #
+        # rstrip() just removes the new line characters from the end of the line.  The line is still in bytes,
+        # and only gets turned into a string with decode() when we actually use it.
+        #
+        raw = raw.rstrip()
+
+        #
+        # Each header line starts with the same text every time, so startswith() is all we need to find them.
+        #
+        # This is the header at the start of the data rows.  Once this line is seen, the header is done and we
+        # return what we found.  The name of the first column comes after the first tab.
+        #
+        if raw.startswith(_HEADER_PREFIX):
+            field = fields[raw.split(b'\t', 2)[1].decode('utf-8', 'replace')]
+            if (field == 'duration'):
+                field = 'wetdry'
+
+            return field, start, dps
+
+        #
+        # "elif" is like doing "else if".  This is part of the if/elif that started with the check for the
+        # column header.  It's looking for the line that says when you programmed the data logger, and saves
+        # the time to "start".  The time ends at the first period.  partition() splits the string at that
+        # period, and "dot" will be empty if there wasn't one.
+        #
+        elif raw.startswith(_PROGRAMMED_PREFIX):
+            value, dot, _ = raw[len(_PROGRAMMED_PREFIX):].partition(b'.')
+            if dot:
+                start = parse_time(value.decode('utf-8', 'replace'))
+
+        #
+        # Still aligned, this only executes if the previous if and elif aren't true.  This looks for when you
+        # stopped the logger and saves the time to "end"
+        #
+        elif raw.startswith(_END_PREFIX):
+            end = parse_time(raw[len(_END_PREFIX):].decode('utf-8', 'replace'))
+
+        #
+        # Last, look for the line that gives us the drift, and use that to calculate the "dps".  We calculate
+        # that by taking the amount of drift divided by the number of seconds between "start" and "end"
+        #
+        elif raw.startswith(_DRIFT_PREFIX):
+            value, dot, _ = raw[len(_DRIFT_PREFIX):].partition(b'.')
+            if dot:
+                drift = int(value)
+                dps = drift / (end - start)
+
+    #
+    # We got to the end of the file without finding the column header, so there's no data.  None is python's
+    # null value.
+    #
+    return None, start, dps
+
+#
+# This reads the data rows from "buffer", after _parse_header() has read the header lines.  Everything about
+# the file is already known, so the loop below only has to deal with data rows.
+#
+def _parse_body(buffer, field, start, dps):
+    #
+    # Create an array to store the data from the file.  Each data row is stored as a "tuple", which is like
+    # an array that can't be changed.  Every tuple holds the adjusted time, the original time, the local
+    # time, and then the values from the file.  "names" is a tuple of the names of those values, and depends
+    # on the type of file.
+    #
+    rows = []
+
+    #
+    # Work out how many splits the data rows need, and the names of the values in them.  Wet/dry files use the
+    # first three columns, wet temp files use the first five, and everything else just uses the first two.
+    #
+    # The wet/dry and duration values repeat a lot, so they go through sys.intern().  It keeps one copy of each
+    # different string and hands that back every time, instead of storing a new copy for every row.  The values
+    # in the other files are kept exactly as the logger wrote them, so "convert" is None for those.
+    #
+    if (field == 'wetdry'):
+        splits  = 3
+        names   = ('duration', 'wetdry')
+        convert = (sys.intern, sys.intern)
+    elif (field == 'wet_temp_min'):
+        splits  = 5
+        names   = ('wet_temp_min', 'wet_temp_max', 'wet_temp_mean', 'wet_temp_samples')
+        convert = None
+    else:
+        splits  = 2
+        names   = (field,)
+        convert = None
+
+    #
+    # Same as in _parse_header(), but every line from here on is a data row, so we decode each one into a string
+    #
+    for raw in iter(buffer.readline, b''):
+        line = raw.rstrip().decode('utf-8', 'replace')
+
+        #
+        # we use split() to split the line into an array using tabs (\t) as the delimiter.  "splits" limits
+        # how many times it splits, so we don't bother splitting up any columns past the last one we use.
+        #
+        row = line.split("\t", splits)
+
+        #
+        # if the first item is empty just ignore the line and goto the next
+        #
+        if not row[0]:
+            continue
+
+        #
+        # parse the time into a unix timestamp.  if the time can't be parsed correctly, just move on to the
+        # next line
+        #
+        time = parse_time(row[0])
+        if time < 1:
+            continue
+
+        #
+        # "dps" is "delta per second".  It's the amount of skew that should be applied per second of time to the
+        # times in the log files.  "time" minus "start" is how many seconds have passed since the start of the
+        # log file.  Multiple that by the "dps" value to get the amount of skew, and then add that to the time
+        # stamp.  Sometimes "dps" will be negative, so adding it has the same effect as subtracting the skew.
+        #
+        adjtime = time + (dps * (time - start))
+
+        #
+        # Set the local time to be the adjusted time minus the timezone offset
+        #
+        localtime = adjtime - timezone_seconds
+
+        #
+        # Convert the "adjtime" timestamp back to a string time and store in "atime"
+        #
+        atime = time_to_string(adjtime)
+
+        #
+        # The original time as a string.  When there is no drift the adjusted time is the same as the original,
+        # so we can reuse "atime" instead of converting it again.
+        #
+        if adjtime == time:
+            otime = atime
+        else:
+            otime = time_to_string(time)
+
+        #
+        # row[1:splits] is a "slice" of the row array with just the values from the file that we use.  If this
+        # type of file has functions in "convert", run each value through the function for its column.
+        #
+        values = row[1:splits]
+        if convert:
+            values = [function(value) for function,value in zip(convert, values)]
+
+        #
+        # Add the row to our array, with the times as strings.  The * in front of "values" puts them into the
+        # tuple one by one.  If the same time shows up twice, both rows are kept and sorted out when they are
+        # merged into the output.
+        #
+        rows.append((atime, otime, time_to_string(localtime), *values))
+
+    return names, rows
+
+#
+# This is the meat of the script.  It parses individual log files, and returns the names of the fields in
+# the rows along with the rows themselves.
+#
+def read_data_file(path):
+    #
+    # Start with no names and no rows, which is what we return if the file doesn't have any data
+    #
+    rows  = []
+    names = ()
 
     #
     # try/except blocks are used to handle errors.  If an error is thrown in the "try" block, then
@@ -94,127 +319,27 @@ def read_data_file(path):
     # if an error is encountered.
     #
     try:
+        #
+        # An empty file has nothing for us, and mmap can't map a file with no data in it, so just return
+        # with no rows.
+        #
+        if os.path.getsize(path) == 0:
+            return names, rows
+
         #
         # "with" blocks create variables that are only visible in their blocks of code.  It will also
         # clean up any used resources automatically, to avoid resource leaks.  In this case, we are
-        # opening a file, and it will automatically be closed when the "with" block completes.
+        # opening a file in binary mode ('rb'), and then using mmap to map the file into memory, so we can
+        # read it without copying it into another buffer first.  Both will automatically be closed when the
+        # "with" block completes.
         #
-        with open(path, 'r') as file:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
             #
-            # "file" is a file handle, but python lets you read from it as if it was an array if you
-            # want to
+            # Read the header first.  If it found the column header, read the data rows after it.
             #
-            for line in file:
-                #
-                # strip() just removes the new line characters from the end of the line
-                line = line.strip()
-
-                #
-                # "in_data" is a variable that indicates whether or not we are in the data section of the
-                # file or still processing the headers.
-                #
-                if in_data:
-                    #
-                    # if we are in the data section, we use split() to split the line into an array using
-                    # tabs (\t) as the delimiter
-                    #
-                    row = line.split("\t")
-
-                    #
-                    # if the first item is empty just ignore the line and goto the next
-                    #
-                    if not row[0]:
-                        continue
-
-                    #
-                    # parse the time into a unix timestamp.  if the time can't be parsed correctly,
-                    # just move on to the next line
-                    #
-                    time = parse_time(row[0])
-                    if time < 1:
-                        continue
-
-                    #
-                    # "dps" is "delta per second".  It's the amount of skew that should be applied per second of
-                    # time to the times in the log files.  "time" minus "start" is how many seconds have passed
-                    # since the start of the log file.  Multiple that by the "dps" value to get the amount of skew,
-                    # and then add that to the time stamp.  Sometimes "dps" will be negative, so adding it has the
-                    # same effect as subtracting the skew.
-                    #
-                    adjtime = time + (dps * (time - start))
-
-                    #
-                    # Set the local time to be the adjusted time minus the timezone offset
-                    #
-                    localtime = adjtime - 3600 * timezone_offset
-
-                    #
-                    # Convert the "adjtime" timestamp back to a string time and store in "atime"
-                    #
-                    atime = time_to_string(adjtime)
-
-                    #
-                    # if "atime" does not already exist in the data dictionary, then create it
-                    #
-                    if atime not in data.keys():
-                        data[atime] = {}
-
-                    #
-                    # Store the time and local time as strings in the data dictionary
-                    #
-                    data[atime]['time']      = time_to_string(time)
-                    data[atime]['localtime'] = time_to_string(localtime)
-
-                    #
-                    # This assigns the data from the file to the proper fields depending on the type of file it is.
-                    # "elif" is like doing "else if".
-                    if (field == 'wetdry'):
-                        data[atime]['wetdry']   = row[2]
-                        data[atime]['duration'] = row[1]
-                    elif (field == 'wet_temp_min'):
-                        data[atime]['wet_temp_min']     = row[1]
-                        data[atime]['wet_temp_max']     = row[2]
-                        data[atime]['wet_temp_mean']    = row[3]
-                        data[atime]['wet_temp_samples'] = row[4]
-                    else:
-                        data[atime][field] = row[1]
-
-                #
-                # Remember this lines up with the "if" statement above that checks the "in_data" variable.
-                # If we aren't in data, it means we are still processing the headers.  Each of these is a "regular
-                # expression" that is used to match strings.  Those are a whole different lesson.
-                #
-                # This is the header at the start of the data rows. Once this line is seen, the "in_data" variable
-                # is set to true.
-                #
-                elif (m := re.match(r'^DD/MM/YYYY HH:MM:SS\t(.*?)(\t(.*?))?$', line)):
-                    field = fields[m.group(1)]
-                    if (field == 'duration'):
-                        field = 'wetdry'
-
-                    in_data = True
-
-                #
-                # since we are still aligned with the elif above, this is part of the if/elif/else that started with
-                # the check to see if we were in data.  It's looking for the line that says when you programmed the
-                # data logger, and saves the time to "start"
-                #
-                elif (m := re.match(r'^Programmed: (.*?)\.', line)):
-                    start = parse_time(m.group(1))
-
-                #
-                # Still aligned, this only executes if the previous if and two elifs aren't true.  This looks for
-                # when you stopped the logger and saves the time to "end"
-                #
-                elif (m := re.match(r'^End of logging \(DD/MM/YYYY HH:MM:SS\): (.*?)$', line)):
-                    end = parse_time(m.group(1))
-
-                #
-                # Last, look for the line that gives us the drift, and use that to calculate the "dps".  We calculate
-                # that by taking the amount of drift divided by the number of seconds between "start" and "end"
-                elif (m := re.match(r'^Drift \(secs\): (.*?)\.', line)):
-                    drift = int(m.group(1))
-                    dps = drift / (end - start)
+            field, start, dps = _parse_header(buffer)
+            if field != None:
+                names, rows = _parse_body(buffer, field, start, dps)
 
     #
     # If there is an error opening the file, just report it.
@@ -223,185 +348,211 @@ def read_data_file(path):
         print("Could not read file:", path)
 
     #
-    # this exits the funtion and returns data back to what ever called it.
+    # Any other error means something in the file couldn't be parsed, like a column header we don't know.
+    # The file is read in a worker process, so the error wouldn't say which file it was.  We raise a new
+    # error that names the file, and "from error" keeps the original error attached so it is shown too.
     #
-    return data
+    except Exception as error:
+        raise RuntimeError("Could not parse file: " + path) from error
 
-#
-# This is where execution of our code starts when you run the script.  You can put the function
-# definitions later if you want, but it's pretty common to define functions before they are used.
-#
+    #
+    # this exits the funtion and returns the names and rows back to what ever called it.
+    #
+    return names, rows
 
 #
-# sys.argv is an array (called lists in Python, but I am used to calling them arrays) that contains
-# command line arguments.  First we check if at least 2 arguments are given (the program name itself
-# counts as one), and also if the second argument is a directory that exists.  If either thing is
-# not true, it prints a message and quits.
+# This fills in the blanks in a column with the next known value after them.  "known" is a sorted array of the
+# positions in the column that have values.  Everything between the previous known position and the current
+# one gets the current value.  Assigning to a slice like column[start:position] replaces that whole part of
+# the array at once, instead of one value at a time.  Blanks after the last known value are left alone.
 #
-if (len(sys.argv) < 2 or not os.path.isdir(sys.argv[1])):
-    print("USAGE:", sys.argv[0], "[FOLDER]\n")
-    quit()
+def backfill(column, known):
+    start = 0
+    for position in known:
+        column[start:position] = [column[position]] * (position - start)
+        start = position + 1
 
 #
-# First we save the command line argument to a variable named "path" just to make it easier to reference.
-# and then we get a list of files from that directory.  The first glob() call returns an array of files
-# that we save in the "files" variable.  Then we use the extend() method on the array to append the results
-# of the next two glob calls.
-#
-# NOTE:  We are calling glob.glob here, because up above the script imported the whole glob library.  You
-# can do:
-#
-#     from glob import glob
-#
-# so that you can just call glob() instead of glob.glob()
-#
-path = sys.argv[1]
-files = glob.glob(path + '/*.deg')
-files.extend(glob.glob(path + '/*.lux'))
-files.extend(glob.glob(path + '/*.sst'))
-
-#
-# Dictionaries are at type of data in Python that allow you to store key/value pairs.  You can assign data
-# by doing:
-#
-#     dict[key] = value
+# This is where execution of our code starts when you run the script.  You can put the function
+# definitions later if you want, but it's pretty common to define functions before they are used.
 #
-# By default, the order of data in the dictionary is not preserved, so we are using an OrderedDict for our
-# data to ensure we can sort it and maintain order.  We pass an empty array to the OrderedDict() method to
-# create an empty ordered dictionary.
+# The code below is inside an "if" that checks __name__.  When you run the script, __name__ is set to
+# '__main__'.  We start extra worker processes to read the files further down, and on some systems those
+# workers load this script again to find read_data_file().  For them __name__ is something else, so they
+# skip this part instead of running the whole program again.
 #
-output = OrderedDict()
+if __name__ == '__main__':
+    #
+    # sys.argv is an array (called lists in Python, but I am used to calling them arrays) that contains
+    # command line arguments.  First we check if at least 2 arguments are given (the program name itself
+    # counts as one), and also if the second argument is a directory that exists.  If either thing is
+    # not true, it prints a message and quits.
+    #
+    if (len(sys.argv) < 2 or not os.path.isdir(sys.argv[1])):
+        print("USAGE:", sys.argv[0], "[FOLDER]\n")
+        quit()
 
-#
-# "files" is the array of file names that we created above.  We use a "for" loop to iterate over it.  For
-# each iteration, the variable "file" is filled in as the current value.
-#
-for file in files:
     #
-    # This checks to see if the string 'driftadj' is part of the filename.  If it is, we use "continue"
-    # to move to the next iteration without doing anything more.
+    # First we save the command line argument to a variable named "path" just to make it easier to reference.
+    # and then we get a list of files from that directory.
+    #
+    # os.scandir() reads the directory once and gives us an entry for everything in it.  The square brackets
+    # around the "for" are a "list comprehension", which builds an array from the entries that pass the "if".
+    # We keep regular files that end in one of our extensions, skipping hidden files that start with a period,
+    # and any file with the string 'driftadj' in its name, since we don't want to read those.
     #
-    if 'driftadj' in file:
-        continue
+    path = sys.argv[1]
+    extensions = ('.deg', '.lux', '.sst')
+    files = [
+        entry for entry in os.scandir(path)
+        if entry.name.endswith(extensions) and not entry.name.startswith('.') and 'driftadj' not in entry.name and entry.is_file()
+    ]
 
     #
-    # This just logs the filename to stderr.  By sending it to stderr, you can pipe the output of the program
-    # to a file, but this will still show in the console.
+    # When more than one file has data for the same time, the first file read sets the original and local
+    # times, and the last one wins for any value they both have, so we always read the .deg files first, then
+    # .lux, then .sst.  sort() keeps files with the same extension in the order they were found.  Then we turn
+    # the entries into their full paths.
     #
-    print(file, file=sys.stderr)
+    files.sort(key=lambda entry: extensions.index(os.path.splitext(entry.name)[1]))
+    files = [entry.path for entry in files]
 
     #
-    # Pass the filename to the read_data_file() function we created above, and save the result in a variable
-    # name "data"
+    # Dictionaries are at type of data in Python that allow you to store key/value pairs.  You can assign data
+    # by doing:
     #
-    data = read_data_file(file)
+    #     dict[key] = value
+    #
+    # Instead of keeping a separate dictionary for every point in time, we store the output as "columns".  Each
+    # field gets one array, and the values for a point in time are all at the same position in every array.
+    # "index" is a dictionary that tells us which position belongs to each date.
+    #
+    fields  = ['time','localtime','temp','wets','light','wetdry','duration','wet_temp_min','wet_temp_max','wet_temp_mean','wet_temp_samples']
+    columns = {field: [] for field in fields}
+    index   = {}
 
     #
-    # The result of read_data_file is a dictionary.  You can iterate over a dictionary with "for" the same way
-    # you do with an array, but you can capture the key name along with the value.  In this case, we are storing
-    # the key as "date", and the value in "values".
+    # The time columns are used for every row, so we keep them in their own variables too
     #
-    for date,values in data.items():
-        #
-        # Check to see if the date already exists in our output dictionary.  If it doesn't, then set it to an
-        # empty dictionary to avoid KeyErrors
-        #
-        if date not in output.keys():
-            output[date] = {}
+    times      = columns['time']
+    localtimes = columns['localtime']
 
-        #
-        # Here we iterate over an array of field names, check if they exist in the data from the file, and if so
-        # merge them into the output.  If the field does not exist in the data, just set it to a null value, which
-        # is "None" in python.  This avoids some KeyErrors later when we output the data.
-        #
-        for field in ['time','localtime','temp','wets','light','wetdry','duration','wet_temp_min','wet_temp_max','wet_temp_mean','wet_temp_samples']:
-            if field in values.keys():
-                output[date][field] = values[field]
-            elif field not in output[date].keys():
-                output[date][field] = None
+    #
+    # Each file can be read without knowing anything about the others, so we read them in separate processes
+    # to use all of the computer's CPU cores.  ProcessPoolExecutor starts the worker processes, and map() runs
+    # read_data_file() on each file in one of the workers.  "chunksize" hands the files to the workers a few at
+    # a time, so less time is spent passing them back and forth.  The results come back in the same order as
+    # "files", so zip() pairs each file name with its data.
+    #
+    with ProcessPoolExecutor() as executor:
+        for file,(names,rows) in zip(files, executor.map(read_data_file, files, chunksize=4)):
+            #
+            # This just logs the filename to stderr.  By sending it to stderr, you can pipe the output of the
+            # program to a file, but this will still show in the console.
+            #
+            print(file, file=sys.stderr)
 
-#
-# All files have been read at this point.  We need to clean up the data by interpolating some values so there
-# are not any gaps.  First we need to sort the data in reverse order by time, so we can interpolate wet/dry
-# and water temp values
-#
+            #
+            # Get the column for each of the names in the rows from this file, so we only look them up once
+            #
+            targets = [columns[name] for name in names]
 
-#
-# We create an array called "keys" that stores a reverse sorted array of dates from the "output" dictionary.
-#
-keys = sorted(output.keys(), reverse=True)
+            #
+            # The result of read_data_file is an array of rows.  With "for", we can unpack each row into the
+            # date, the original and local times, and the rest of its values.  The * in front of "values"
+            # collects all of the rest into it.
+            #
+            for date,otime,ltime,*values in rows:
+                #
+                # Look up the position of the date.  get() returns None if it isn't there yet, in which case we
+                # give it the next position and add a null value, which is "None" in python, to the end of every
+                # column.  This avoids some IndexErrors later when we output the data.
+                #
+                position = index.get(date)
+                if position is None:
+                    position = index[date] = len(index)
+                    for column in columns.values():
+                        column.append(None)
 
-#
-# Then use the sorted keys to create a temporary dictionary, so that the keys are in order
-#
-temp = OrderedDict()
-for key in keys:
-    temp[key] = output[key]
+                #
+                # The original and local times are only set by the first file that has this date.  Another file
+                # with the same adjusted time doesn't replace them.
+                #
+                if times[position] is None:
+                    times[position]      = otime
+                    localtimes[position] = ltime
 
-#
-# "state" is a dictonary used to store the current values that we need to fill into the blanks
-#
-state = dict()
+                #
+                # Merge the values from the file into the columns at the date's position.  zip() pairs each
+                # value with the column it belongs in.
+                #
+                for column,value in zip(targets, values):
+                    column[position] = value
 
-for time,values in temp.items():
     #
-    # Check to see if the current time has wet values set.  Set the state to the current value.
+    # All files have been read at this point.  We need to clean up the data by interpolating some values so there
+    # are not any gaps.  First we need to sort the data by time, so we can interpolate wet/dry and water temp
+    # values
     #
-    if 'wet_temp_min' in values.keys() and values['wet_temp_min'] != None:
-        state['wet_temp_min'] = values['wet_temp_min']
-        state['wet_temp_max'] = values['wet_temp_max']
-        state['wet_temp_mean'] = values['wet_temp_mean']
-        state['wet_temp_samples'] = values['wet_temp_samples']
 
     #
-    # If the state contains wet values, and if so, fill it into the current time.  In cases where wet
-    # values were already set, this is redundant, but doesn't cause any problems.
+    # "dates" is a sorted array of all the dates.  "order" is the position of each of those dates in the columns,
+    # so we can use it to put every column into the same sorted order.
     #
-    if 'wet_temp_min' in state.keys():
-        values['wet_temp_min'] = state['wet_temp_min']
-        values['wet_temp_max'] = state['wet_temp_max']
-        values['wet_temp_mean'] = state['wet_temp_mean']
-        values['wet_temp_samples'] = state['wet_temp_samples']
+    dates = sorted(index)
+    order = [index[date] for date in dates]
+    for field,column in columns.items():
+        columns[field] = [column[position] for position in order]
 
     #
-    # Same as above, but for some other values
+    # Find the positions that have wet temp values, and fill the blanks before each of them in all four wet temp
+    # columns.  The four values always come from the same row of the same file, so wet_temp_min tells us where
+    # all of them are.
     #
-    if 'wetdry' in values.keys() and values['wetdry'] != None:
-        state['wetdry'] = values['wetdry']
-        state['duration'] = values['duration']
+    known = [position for position,value in enumerate(columns['wet_temp_min']) if value != None]
+    for field in ['wet_temp_min','wet_temp_max','wet_temp_mean','wet_temp_samples']:
+        backfill(columns[field], known)
 
-    if 'wetdry' in state.keys():
-        values['wetdry'] = state['wetdry']
+    #
+    # Same as above, but for the wet/dry value
+    #
+    known = [position for position,value in enumerate(columns['wetdry']) if value != None]
+    backfill(columns['wetdry'], known)
 
     #
-    # Save the modified values into our temporary dictionary
+    # The data is now done being processed, and we just need to dump it to a CSV file.  You can use the "csv"
+    # library to write to files or to stdout.  I choose to write to stdout... I don't know why, but that's what
+    # I did.
+    #
+    # Rather than writing through sys.stdout directly, we open the same output again with a 1MB buffer.  Rows
+    # are collected in memory until the buffer is full, so there are far fewer writes when the output is piped
+    # to a file.  closefd=False means closing "out" won't close stdout itself, and newline='' lets the csv
+    # library control the line endings.
     #
-    temp[time] = values
+    sys.stdout.flush()
+    out = open(sys.stdout.fileno(), 'w', buffering=1 << 20, encoding=sys.stdout.encoding, newline='', closefd=False)
+    writer = csv.writer(out)
 
-#
-# With all the values interpolated, we sort the temp dictionary in forward order, and save it back to
-# the output dictionary
-#
-keys = sorted(temp.keys(), reverse=False)
-output = OrderedDict()
-for key in keys:
-    output[key] = temp[key]
+    #
+    # Write the header row of the csv
+    #
+    writer.writerow(['Adjusted UTC Time','Adjusted Local Time','Original UTC Time','Temp','Light','Wets','Wet/Dry','Duration','Wet Temp (min)','Wet Temp (max)','Wet Temp (mean)','Wet Temp (samples)'])
 
-#
-# The data is now done being processed, and we just need to dump it to a CSV file.  You can use the "csv"
-# library to write to files or to stdout.  I choose to write to stdout... I don't know why, but that's what
-# I did.
-#
-writer = csv.writer(sys.stdout)
+    #
+    # itemgetter() creates a function that pulls all of these columns out of the dictionary at once, and gives
+    # them back in this order.
+    #
+    getter = operator.itemgetter('localtime','time','temp','light','wets','wetdry','duration','wet_temp_min','wet_temp_max','wet_temp_mean','wet_temp_samples')
 
-#
-# Write the header row of the csv
-#
-writer.writerow(['Adjusted UTC Time','Adjusted Local Time','Original UTC Time','Temp','Light','Wets','Wet/Dry','Duration','Wet Temp (min)','Wet Temp (max)','Wet Temp (mean)','Wet Temp (samples)'])
+    #
+    # Write each data point as a row in the csv file.  zip() walks the dates and all of the columns together,
+    # giving us one row at a time with a value from each.  The * in front of getter(columns) passes each column
+    # to zip() separately.  writerows() takes all the rows at once.
+    #
+    writer.writerows(zip(dates, *getter(columns)))
 
-#
-# Iterate over the output, and write each data point as a row in the csv file
-#
-for time,values in output.items():
-    writer.writerow([time, values['localtime'],values['time'],values['temp'],values['light'],values['wets'],values['wetdry'],values['duration'],values['wet_temp_min'],values['wet_temp_max'],values['wet_temp_mean'],values['wet_temp_samples']])
+    #
+    # Make sure anything left in the buffer gets written out
+    #
+    out.flush()
 